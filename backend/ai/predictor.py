@@ -7,8 +7,11 @@ import numpy as np
 import pandas as pd
 from datetime import datetime, timezone
 from pathlib import Path
+from bisect import bisect_left
+import asyncio
 import logging
 import os
+import time
 import joblib
 from sklearn.neural_network import MLPRegressor
 from sklearn.preprocessing import StandardScaler
@@ -19,17 +22,40 @@ from utils.helpers import parse_float
 
 logger = logging.getLogger(__name__)
 
+# The regression window is fixed at 30 samples, so its centered x-vector and
+# sum of squares are compile-time constants; the generic path below only runs
+# for other lengths.
+_LR_WINDOW = 30
+_X_CENT = np.arange(_LR_WINDOW, dtype=np.float64) - (_LR_WINDOW - 1) / 2
+_X_MEAN = (_LR_WINDOW - 1) / 2
+_SSX = float(_X_CENT @ _X_CENT)
+
+# SOC classification table: bisect over the thresholds yields the index of the
+# matching status (<=10 critical, <=20 low, <=50 medium, else good).
+_SOC_THRESHOLDS = (10.0, 20.0, 50.0)
+_SOC_STATUS = (
+    "Battery CRITICAL - All Loads OFF",
+    "Battery LOW - Only Pump Allowed",
+    "Battery MEDIUM - Fan & Light Allowed",
+    "Battery GOOD - All Loads Allowed",
+)
+
 class AIPredictor:
     def __init__(self, csv_path: str = None, model_path: str = None):
         self.csv_path = csv_path or Path(__file__).parent.parent / "feeds.csv"
         self.model_path = model_path or Path(__file__).parent.parent / "mlp_model.joblib"
         self.scaler_path = Path(__file__).parent.parent / "scaler.joblib"
         self._cache = None
-        self._cache_time = None
+        self._cache_time = None  # monotonic timestamp of last computation
+        self._compute_lock = asyncio.Lock()  # single-flight for concurrent requests
+        self._ewma_weights = {}  # length -> geometric weight vector
+        self._tw_weights = {}  # length -> normalized exponential weight vector
         self.mlp_model = None
         self.scaler = None
         self.last_training_time = None
-        self._load_or_train_model()
+        # Model load/training is deferred to the first prediction request so
+        # importing this module stays cheap (no CSV parse or MLP fit at startup).
+        self._model_loaded = False
 
     def _load_or_train_model(self):
         """Load existing model if available, otherwise train from CSV."""
@@ -51,13 +77,20 @@ class AIPredictor:
             return
 
         try:
-            df = pd.read_csv(self.csv_path)
+            # Only three columns feed the model; declaring them (plus dtypes and
+            # date parsing) up front avoids loading and type-inferring the rest.
+            df = pd.read_csv(
+                self.csv_path,
+                usecols=['created_at', 'field5', 'field6'],
+                dtype={'field5': np.float32, 'field6': np.float32},
+                parse_dates=['created_at'],
+                memory_map=True
+            )
             if df.empty:
                 logger.warning("CSV file is empty, skipping MLP training")
                 return
 
-            # Parse timestamps and sort
-            df['created_at'] = pd.to_datetime(df['created_at'])
+            # Sort chronologically
             df = df.sort_values('created_at').reset_index(drop=True)
 
             # Calculate solar power (field5 * field6)
@@ -72,9 +105,11 @@ class AIPredictor:
             df['target_1h'] = df['solar_power'].shift(-12)
             df = df.dropna(subset=['target_1h']).copy()
 
-            # Feature engineering
-            df['hour'] = df['created_at'].dt.hour
-            df['dayofweek'] = df['created_at'].dt.dayofweek
+            # Feature engineering — hour/dayofweek fit in int8, and once they
+            # are derived the datetime column is dead weight
+            df['hour'] = df['created_at'].dt.hour.astype(np.int8)
+            df['dayofweek'] = df['created_at'].dt.dayofweek.astype(np.int8)
+            df.drop(columns=['created_at'], inplace=True)
             # Rolling mean of last 6 readings (30 min) – use bfill() instead of fillna(method='bfill')
             df['rolling_power'] = df['solar_power'].rolling(window=6, min_periods=1).mean().bfill()
             features = df[['hour', 'dayofweek', 'field5', 'field6', 'rolling_power']].values
@@ -124,78 +159,144 @@ class AIPredictor:
             return True
         return False
 
+    def _cache_fresh(self) -> bool:
+        return (self._cache is not None and self._cache_time is not None
+                and time.monotonic() - self._cache_time < 30)
+
     async def get_predictions(self):
-        """Return cached predictions if fresh (<30s), otherwise compute new ones."""
-        if self._cache and self._cache_time:
-            age = (datetime.now(timezone.utc) - self._cache_time).total_seconds()
-            if age < 30:
-                logger.debug("Returning cached predictions")
+        """Return cached predictions if fresh (<30s), otherwise compute new ones.
+        Concurrent callers share one computation instead of each hitting
+        ThingSpeak: the lock serializes them and all but the first return the
+        cache the first one just filled."""
+        if self._cache_fresh():
+            logger.debug("Returning cached predictions")
+            return self._cache
+
+        async with self._compute_lock:
+            if self._cache_fresh():
                 return self._cache
 
-        # Check if retraining is needed
-        if self._should_retrain():
-            self._train_model()
+            # Lazy first load, then periodic retraining checks
+            if not self._model_loaded:
+                self._load_or_train_model()
+                self._model_loaded = True
+            elif self._should_retrain():
+                self._train_model()
+
+            logger.info("Computing fresh predictions")
+            result = await self._compute_predictions()
+            self._cache = result
+            self._cache_time = time.monotonic()
+            return result
+
+    def _numeric_kernel(self, solar_powers: np.ndarray) -> tuple:
+        """Pure-array numeric core of the prediction pipeline.
+        Returns (lr_1h, lr_2h, ewma, time_weighted, confidence).
+        Kept free of I/O and object traffic so the whole block is a handful
+        of vectorized reductions."""
+        # 1. Linear regression on last 30 points (closed-form OLS, no model object)
+        recent = solar_powers[-30:]
+        n = recent.size
+        slope, intercept = self._linear_trend(recent)
+        lr_1h = float(intercept + slope * (n + 12))
+        lr_2h = float(intercept + slope * (n + 24))
+
+        # 2. Exponential Weighted Moving Average as a single dot product:
+        # unrolling the recursion gives geometric weights over the window,
+        # so the 30-step Python loop collapses to one vectorized reduction.
+        alpha = 2 / (30 + 1)
+        w = self._ewma_weights.get(n)
+        if w is None:
+            w = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1, dtype=np.float64)
+            w[0] = (1 - alpha) ** (n - 1)  # seed term carries no alpha factor
+            self._ewma_weights[n] = w
+        ewma = float(w @ recent)
+
+        # 3. Time-weighted average (weights depend only on length, so cache them)
+        m = solar_powers.size
+        tw = self._tw_weights.get(m)
+        if tw is None:
+            tw = np.exp(np.linspace(0, 2, m))
+            tw /= tw.sum()
+            self._tw_weights[m] = tw
+        time_weighted = float(tw @ solar_powers)
+
+        # Confidence based on variance of the regression window. Derive the
+        # variance from sum / sum-of-squares (E[x^2] - E[x]^2) so the window is
+        # walked once instead of np.var's mean-then-deviations double pass.
+        if n > 1:
+            mean = recent.sum() / n
+            variance = (recent @ recent) / n - mean * mean
+        else:
+            variance = 0
+        max_power = solar_powers.max() if m else 1
+        confidence = max(0, min(100, 100 * (1 - variance / (max_power**2 + 1)))) if max_power > 0 else 0
 
-        logger.info("Computing fresh predictions")
-        result = await self._compute_predictions()
-        self._cache = result
-        self._cache_time = datetime.now(timezone.utc)
-        return result
+        # Native floats serialize faster than NumPy scalars and keep the cached
+        # response dict JSON-clean
+        return lr_1h, lr_2h, ewma, time_weighted, float(confidence)
+
+    @staticmethod
+    def _linear_trend(arr: np.ndarray) -> tuple:
+        """Closed-form OLS slope/intercept for y over x = 0..n-1.
+        Equivalent to np.polyfit(x, arr, 1) without the Vandermonde/lstsq path."""
+        n = arr.size
+        if n == _LR_WINDOW:
+            xc, xm, ssx = _X_CENT, _X_MEAN, _SSX
+        else:
+            x = np.arange(n, dtype=np.float64)
+            xm = x.mean()
+            xc = x - xm
+            ssx = xc @ xc
+        ym = arr.mean()
+        slope = (xc @ (arr - ym)) / ssx
+        intercept = ym - slope * xm
+        return slope, intercept
 
     async def _compute_predictions(self):
         """Generate AI predictions using MLP (if available) and fallback methods."""
-        # Fetch recent data
-        try:
-            feeds = await thingspeak.fetch_feeds(results=288)
-        except Exception as e:
-            logger.error(f"Failed to fetch feeds for predictions: {e}")
+        # Fetch recent history and the latest entry concurrently — the two
+        # requests are independent, so wall time is one round-trip, not two.
+        feeds, latest = await asyncio.gather(
+            thingspeak.fetch_feeds(results=288),
+            thingspeak.fetch_latest(),
+            return_exceptions=True
+        )
+        if isinstance(feeds, BaseException):
+            logger.error(f"Failed to fetch feeds for predictions: {feeds}")
             return self._fallback_predictions("ThingSpeak unavailable")
+        if isinstance(latest, BaseException):
+            logger.error(f"Failed to fetch latest feed: {latest}")
+            latest = None
 
         if not feeds or len(feeds) < 30:
             logger.warning(f"Insufficient data for predictions: {len(feeds) if feeds else 0} points")
             return self._fallback_predictions("Insufficient data")
 
-        # Extract solar power values for traditional methods
-        solar_powers = []
-        for feed in feeds:
-            try:
-                v = parse_float(feed.get('field5'))
-                i = parse_float(feed.get('field6'))
-                power = v * i
-                solar_powers.append(power)
-            except Exception:
-                continue
+        # Extract solar power values for traditional methods (one vectorized
+        # multiply instead of a per-feed Python loop)
+        count = len(feeds)
+        v_arr = np.fromiter((parse_float(f.get('field5')) for f in feeds),
+                            dtype=np.float64, count=count)
+        i_arr = np.fromiter((parse_float(f.get('field6')) for f in feeds),
+                            dtype=np.float64, count=count)
+        solar_powers = v_arr * i_arr
 
         if len(solar_powers) < 30:
             return self._fallback_predictions("Insufficient valid power data")
 
-        # 1. Linear regression on last 30 points
-        recent = solar_powers[-30:]
-        x = np.arange(len(recent))
-        slope, intercept = np.polyfit(x, recent, 1)
-        lr_1h = intercept + slope * (len(recent) + 12)
-        lr_2h = intercept + slope * (len(recent) + 24)
-
-        # 2. Exponential Weighted Moving Average
-        alpha = 2 / (30 + 1)
-        ewma = recent[0]
-        for value in recent[1:]:
-            ewma = alpha * value + (1 - alpha) * ewma
-
-        # 3. Time-weighted average
-        weights = np.exp(np.linspace(0, 2, len(solar_powers)))
-        weights /= weights.sum()
-        time_weighted = np.average(solar_powers, weights=weights)
+        lr_1h, lr_2h, ewma, time_weighted, confidence = self._numeric_kernel(solar_powers)
 
         # 4. MLP prediction using latest feed
         mlp_1h = None
         if self.mlp_model and self.scaler:
             try:
-                latest = feeds[0]  # most recent
-                hour = datetime.now().hour
-                day = datetime.now().weekday()
-                v = parse_float(latest.get('field5'))
-                i = parse_float(latest.get('field6'))
+                newest = feeds[0]  # most recent
+                now = datetime.now()
+                hour = now.hour
+                day = now.weekday()
+                v = parse_float(newest.get('field5'))
+                i = parse_float(newest.get('field6'))
                 rolling = np.mean(solar_powers[-6:]) if len(solar_powers) >= 6 else solar_powers[-1]
                 features = np.array([[hour, day, v, i, rolling]])
                 features_scaled = self.scaler.transform(features)
@@ -205,26 +306,10 @@ class AIPredictor:
                 logger.error(f"MLP prediction failed: {e}")
                 mlp_1h = None
 
-        # Confidence based on variance
-        variance = np.var(recent) if len(recent) > 1 else 0
-        max_power = max(solar_powers) if solar_powers else 1
-        confidence = max(0, min(100, 100 * (1 - variance / (max_power**2 + 1)))) if max_power > 0 else 0
+        # Battery status (latest was fetched alongside the history above)
+        battery_soc = parse_float(latest.get('field3')) if latest else 50.0
 
-        # Battery status
-        try:
-            latest = await thingspeak.fetch_latest()
-            battery_soc = parse_float(latest.get('field3')) if latest else 50.0
-        except Exception:
-            battery_soc = 50.0
-
-        if battery_soc <= 10:
-            status = "Battery CRITICAL - All Loads OFF"
-        elif battery_soc <= 20:
-            status = "Battery LOW - Only Pump Allowed"
-        elif battery_soc <= 50:
-            status = "Battery MEDIUM - Fan & Light Allowed"
-        else:
-            status = "Battery GOOD - All Loads Allowed"
+        status = _SOC_STATUS[bisect_left(_SOC_THRESHOLDS, battery_soc)]
 
         # Use MLP if available, otherwise fallback to LR
         solar_1h = round(mlp_1h, 1) if mlp_1h is not None else max(0, round(lr_1h, 1))
@@ -13,6 +13,10 @@ JWT_SECRET = JWT_SECRET_KEY
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
 
+# bcrypt work factor — tunable per deployment so registration latency can be
+# traded against hash strength without a code change
+BCRYPT_COST = int(os.environ.get('BCRYPT_COST', 12))
+
 CORS_ORIGINS = os.environ.get('CORS_ORIGINS', "https://your-site.netlify.app").split(',')
 
 THINGSPEAK_CHANNEL_ID = os.environ.get('THINGSPEAK_CHANNEL_ID', '3242868')
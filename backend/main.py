@@ -9,14 +9,21 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
 from fastapi import FastAPI, APIRouter, HTTPException, Depends, WebSocket, WebSocketDisconnect
-from fastapi.responses import Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 from datetime import datetime, timezone, timedelta
-from typing import List
 import asyncio
+import csv
+import io
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+import httpx
 import jwt
+import numpy as np
+import orjson
 
 # Internal imports
 from core.config import (
@@ -32,25 +39,44 @@ from models.schemas import (
     SolarData, BatteryData, LoadData, GridData, DashboardData,
     LoadControl, PredictionResult
 )
-from utils.auth import hash_password, verify_password, create_token, verify_token
+from utils.auth import (
+    hash_password_async, verify_password_async, create_token, verify_token,
+    shutdown_crypto_pool
+)
 from utils.helpers import parse_float
 
-# Configure logging
+# Configure logging through a queue: handlers write+flush synchronously, so
+# routing records via QueueHandler keeps that I/O in a listener thread
+# instead of blocking the event loop
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
+_log_queue = queue.Queue(-1)
+_root_logger = logging.getLogger()
+_log_listener = QueueListener(_log_queue, *_root_logger.handlers,
+                              respect_handler_level=True)
+_root_logger.handlers = [QueueHandler(_log_queue)]
+_log_listener.start()
 logger = logging.getLogger(__name__)
 
-# MongoDB connection
-client = AsyncIOMotorClient(MONGO_URL)
+# MongoDB connection — sized pool and a bounded server-selection timeout so
+# concurrent auth fan-in doesn't queue behind connection churn or hang on an
+# unreachable cluster
+client = AsyncIOMotorClient(
+    MONGO_URL,
+    maxPoolSize=50,
+    minPoolSize=5,
+    serverSelectionTimeoutMS=2000
+)
 db = client[DB_NAME]
 
 # Create FastAPI app
 app = FastAPI(
     title="ISEMS API",
     description="Intelligent Solar Energy Management System API",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Create API router with /api prefix
@@ -59,27 +85,54 @@ api_router = APIRouter(prefix="/api")
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: set = set()
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections.add(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+        self.active_connections.discard(websocket)
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except:
-                pass
+        """Serialize once and fan the payload out to every client."""
+        await self.broadcast_text(orjson.dumps(message).decode())
+
+    async def broadcast_text(self, payload: str, send_timeout: float = 5.0):
+        """Send a pre-serialized payload to all clients concurrently; one slow
+        client no longer stalls the rest, and connections that fail to send
+        (or stall past send_timeout, e.g. a full kernel buffer on a dead
+        link) are dropped."""
+        conns = list(self.active_connections)
+        if not conns:
+            return
+        results = await asyncio.gather(
+            *(asyncio.wait_for(conn.send_text(payload), send_timeout)
+              for conn in conns),
+            return_exceptions=True
+        )
+        for conn, result in zip(conns, results):
+            if isinstance(result, Exception):
+                logger.debug(f"Dropping WebSocket client after send failure: {result}")
+                self.disconnect(conn)
 
 manager = ConnectionManager()
 
 # ==================== HELPER FUNCTIONS ====================
 
+def _feed_timestamp(feed: dict) -> float:
+    """Epoch seconds for a feed's created_at, NaN if missing/unparseable.
+    ThingSpeak returns ISO strings with 'Z', which fromisoformat handles
+    natively on Python 3.11+; the replace() fallback covers older runtimes."""
+    try:
+        raw = feed['created_at']
+        try:
+            return datetime.fromisoformat(raw).timestamp()
+        except ValueError:
+            return datetime.fromisoformat(raw.replace('Z', '+00:00')).timestamp()
+    except (KeyError, ValueError, AttributeError):
+        return float('nan')
+
 async def calculate_energy_24h() -> float:
     """Calculate actual energy produced in the last 24 hours (kWh) by integrating power over time."""
     try:
@@ -91,40 +144,34 @@ async def calculate_energy_24h() -> float:
     if not feeds or len(feeds) < 2:
         return 0.0
 
-    total_energy_wh = 0.0
-    for i in range(1, len(feeds)):
-        prev = feeds[i-1]
-        curr = feeds[i]
-
-        # Parse timestamps (ThingSpeak returns ISO strings with 'Z')
-        try:
-            t_prev = datetime.fromisoformat(prev['created_at'].replace('Z', '+00:00'))
-            t_curr = datetime.fromisoformat(curr['created_at'].replace('Z', '+00:00'))
-        except (KeyError, ValueError) as e:
-            logger.debug(f"Timestamp parsing error: {e}")
-            continue
-
-        delta_hours = (t_curr - t_prev).total_seconds() / 3600.0
-        if delta_hours <= 0:
-            continue
-
-        # Average power between two points (field5 * field6)
-        power_prev = parse_float(prev.get('field5')) * parse_float(prev.get('field6'))
-        power_curr = parse_float(curr.get('field5')) * parse_float(curr.get('field6'))
-        avg_power_w = (power_prev + power_curr) / 2.0
+    # Vectorized trapezoidal integration: one pass to build the arrays, then
+    # array arithmetic instead of ~288 interpreted loop iterations.
+    count = len(feeds)
+    ts = np.fromiter((_feed_timestamp(f) for f in feeds), dtype=np.float64, count=count)
+    v = np.fromiter((parse_float(f.get('field5')) for f in feeds), dtype=np.float64, count=count)
+    i = np.fromiter((parse_float(f.get('field6')) for f in feeds), dtype=np.float64, count=count)
+    power = v * i
 
-        # Energy in Wh = avg power (W) * delta_hours (h)
-        total_energy_wh += avg_power_w * delta_hours
+    delta_hours = np.diff(ts) / 3600.0
+    avg_power_w = (power[1:] + power[:-1]) / 2.0
+    # Skip segments with bad timestamps (NaN compares False) or non-positive dt
+    valid = delta_hours > 0
+    total_energy_wh = float((delta_hours[valid] * avg_power_w[valid]).sum())
 
     return round(total_energy_wh / 1000.0, 2)  # convert to kWh
 
-async def build_dashboard_data() -> DashboardData:
-    """Build dashboard data from ThingSpeak with caching."""
-    cache_key = "dashboard_data"
-    cached = cache.get(cache_key)
-    if cached:
-        return DashboardData(**cached)
+async def build_dashboard_dict() -> dict:
+    """Dashboard snapshot as a plain dict, with stale-while-revalidate caching.
+    Requests at a TTL boundary get the previous snapshot immediately while one
+    background task refreshes it, instead of stampeding ThingSpeak. The cached
+    dict is served as-is so the hot path skips Pydantic serialization."""
+    return await cache.get_or_set_swr(
+        "dashboard_data", _compute_dashboard_dict,
+        ttl=CACHE_TTL_SECONDS, stale_ttl=CACHE_TTL_SECONDS * 4
+    )
 
+async def _compute_dashboard_dict() -> dict:
+    """Assemble a fresh dashboard snapshot from ThingSpeak."""
     # Fetch latest data with error handling
     try:
         feed = await thingspeak.fetch_latest()
@@ -195,28 +242,36 @@ async def build_dashboard_data() -> DashboardData:
         last_update=now
     )
 
-    cache.set(cache_key, data.model_dump(), ttl=CACHE_TTL_SECONDS)
-    return data
+    return data.model_dump()
 
 # ==================== AUTH ROUTES ====================
 
+# Prebuilt projections shared by the user lookups below — no per-call dict
+# allocation, and one place to keep the public field set in sync
+_USER_PROJECTION = {"_id": 0, "id": 1, "email": 1, "name": 1}
+_USER_AUTH_PROJECTION = {**_USER_PROJECTION, "password_hash": 1}
+
 @api_router.post("/auth/register", response_model=TokenResponse)
 async def register(user_data: UserCreate):
-    existing = await db.users.find_one({"email": user_data.email}, {"_id": 0})
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
     user = User(email=user_data.email, name=user_data.name)
     user_dict = user.model_dump()
-    user_dict['password_hash'] = hash_password(user_data.password)
-    # created_at is already a datetime object – store natively
-    await db.users.insert_one(user_dict)
+    user_dict['password_hash'] = await hash_password_async(user_data.password)
+    # created_at is already a datetime object – store natively. The unique
+    # index on email makes the insert itself the duplicate check — one DB
+    # round-trip instead of find-then-insert.
+    try:
+        await db.users.insert_one(user_dict)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
     token = create_token(user.id, user.email)
     return TokenResponse(access_token=token, user=user)
 
 @api_router.post("/auth/login", response_model=TokenResponse)
 async def login(credentials: UserLogin):
-    user_doc = await db.users.find_one({"email": credentials.email}, {"_id": 0})
-    if not user_doc or not verify_password(credentials.password, user_doc.get('password_hash', '')):
+    user_doc = await db.users.find_one(
+        {"email": credentials.email}, _USER_AUTH_PROJECTION
+    )
+    if not user_doc or not await verify_password_async(credentials.password, user_doc.get('password_hash', '')):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     user = User(id=user_doc['id'], email=user_doc['email'], name=user_doc['name'])
     token = create_token(user.id, user.email)
@@ -224,78 +279,87 @@ async def login(credentials: UserLogin):
 
 @api_router.get("/auth/me", response_model=User)
 async def get_current_user(payload: dict = Depends(verify_token)):
-    user_doc = await db.users.find_one({"email": payload['email']}, {"_id": 0})
+    user_doc = await db.users.find_one(
+        {"email": payload['email']}, _USER_PROJECTION
+    )
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
     return User(id=user_doc['id'], email=user_doc['email'], name=user_doc['name'])
 
 # ==================== DASHBOARD ROUTES ====================
 
-@api_router.get("/dashboard", response_model=DashboardData)
+# No response_model here: the cached dict was produced by model_dump on a
+# validated DashboardData, so revalidating it on every response is pure
+# overhead on the hottest endpoints. Auth routes keep their models since
+# their inputs come from outside.
+@api_router.get("/dashboard")
 async def get_dashboard(payload: dict = Depends(verify_token)):
-    return await build_dashboard_data()
+    return await build_dashboard_dict()
 
-@api_router.get("/dashboard/public", response_model=DashboardData)
+@api_router.get("/dashboard/public")
 async def get_dashboard_public():
-    return await build_dashboard_data()
+    return await build_dashboard_dict()
 
 # ==================== SOLAR ROUTES ====================
 
 @api_router.get("/solar")
 async def get_solar_data(payload: dict = Depends(verify_token)):
-    data = await build_dashboard_data()
-    try:
-        feeds = await thingspeak.fetch_feeds(results=100)
-    except Exception as e:
-        logger.error(f"Failed to fetch solar history: {e}")
-        feeds = []
+    data, cols = await asyncio.gather(
+        build_dashboard_dict(),
+        thingspeak.fetch_feeds_columnar(results=100),
+        return_exceptions=True
+    )
+    if isinstance(data, BaseException):
+        raise data
+    if isinstance(cols, BaseException):
+        logger.error(f"Failed to fetch solar history: {cols}")
+        cols = None
 
     history = []
-    if feeds:
-        for feed in feeds:
-            solar_v = parse_float(feed.get('field5'))
-            solar_i = parse_float(feed.get('field6'))
-            history.append({
-                "timestamp": feed.get('created_at'),
-                "voltage": solar_v,
-                "current": solar_i,
-                "power": solar_v * solar_i
-            })
+    if cols:
+        power = (cols['field5'] * cols['field6']).tolist()
+        history = [
+            {"timestamp": t, "voltage": v, "current": c, "power": p}
+            for t, v, c, p in zip(cols['timestamp'], cols['field5'].tolist(),
+                                  cols['field6'].tolist(), power)
+        ]
 
     predictions = await predictor.get_predictions()  # cached internally
     return {
-        "current": data.solar.model_dump(),
+        "current": data['solar'],
         "history": history,
         "predictions": predictions,
-        "device_online": data.device_online
+        "device_online": data['device_online']
     }
 
 # ==================== BATTERY ROUTES ====================
 
 @api_router.get("/battery")
 async def get_battery_data(payload: dict = Depends(verify_token)):
-    data = await build_dashboard_data()
-    try:
-        feeds = await thingspeak.fetch_feeds(results=100)
-    except Exception as e:
-        logger.error(f"Failed to fetch battery history: {e}")
-        feeds = []
+    data, cols = await asyncio.gather(
+        build_dashboard_dict(),
+        thingspeak.fetch_feeds_columnar(results=100),
+        return_exceptions=True
+    )
+    if isinstance(data, BaseException):
+        raise data
+    if isinstance(cols, BaseException):
+        logger.error(f"Failed to fetch battery history: {cols}")
+        cols = None
 
     history = []
-    if feeds:
-        for feed in feeds:
-            history.append({
-                "timestamp": feed.get('created_at'),
-                "voltage": parse_float(feed.get('field1')),
-                "current": parse_float(feed.get('field2')),
-                "soc": parse_float(feed.get('field3'))
-            })
+    if cols:
+        history = [
+            {"timestamp": t, "voltage": v, "current": c, "soc": s}
+            for t, v, c, s in zip(cols['timestamp'], cols['field1'].tolist(),
+                                  cols['field2'].tolist(), cols['field3'].tolist())
+        ]
 
     predictions = await predictor.get_predictions()
     return {
-        "current": data.battery.model_dump(),
+        "current": data['battery'],
         "history": history,
-        "device_online": data.device_online,
+        "device_online": data['device_online'],
         "status_text": predictions.get("battery_status", "")
     }
 
@@ -303,21 +367,24 @@ async def get_battery_data(payload: dict = Depends(verify_token)):
 
 @api_router.get("/load")
 async def get_load_data(payload: dict = Depends(verify_token)):
-    data = await build_dashboard_data()
-    try:
-        feeds = await thingspeak.fetch_feeds(results=100)
-    except Exception as e:
-        logger.error(f"Failed to fetch load history: {e}")
-        feeds = []
+    data, cols = await asyncio.gather(
+        build_dashboard_dict(),
+        thingspeak.fetch_feeds_columnar(results=100),
+        return_exceptions=True
+    )
+    if isinstance(data, BaseException):
+        raise data
+    if isinstance(cols, BaseException):
+        logger.error(f"Failed to fetch load history: {cols}")
+        cols = None
 
     history = []
-    if feeds:
-        for feed in feeds:
-            history.append({
-                "timestamp": feed.get('created_at'),
-                "power": parse_float(feed.get('field7')),
-                "current": parse_float(feed.get('field8'))
-            })
+    if cols:
+        history = [
+            {"timestamp": t, "power": p, "current": c}
+            for t, p, c in zip(cols['timestamp'], cols['field7'].tolist(),
+                               cols['field8'].tolist())
+        ]
 
     # Get load states and per‑load metrics with fallback
     load_states = {"light_on": False, "fan_on": False, "pump_on": False}
@@ -333,7 +400,7 @@ async def get_load_data(payload: dict = Depends(verify_token)):
     except Exception as e:
         logger.error(f"Failed to get load metrics: {e}")
 
-    load_data = data.load.model_dump()
+    load_data = dict(data['load'])  # copy so the cached snapshot stays pristine
     load_data.update(load_states)
     load_data["params"] = load_metrics
 
@@ -342,17 +409,18 @@ async def get_load_data(payload: dict = Depends(verify_token)):
         "current": load_data,
         "history": history,
         "predictions": {"load_demand_1h": predictions['linear_regression'].get('load_demand_1h', 0)},
-        "device_online": data.device_online,
-        "battery_soc": data.battery.soc
+        "device_online": data['device_online'],
+        "battery_soc": data['battery']['soc']
     }
 
 @api_router.post("/load/control")
 async def control_load(control: LoadControl, payload: dict = Depends(verify_token)):
-    data = await build_dashboard_data()
+    data = await build_dashboard_dict()
+    battery_soc = data['battery']['soc']
     # SOC safety checks
-    if control.device == "pump" and control.state and data.battery.soc < 20:
+    if control.device == "pump" and control.state and battery_soc < 20:
         raise HTTPException(status_code=400, detail="Cannot enable pump: Battery SOC below 20%. Pump locked.")
-    if control.device == "light" and control.state and data.battery.soc < 10:
+    if control.device == "light" and control.state and battery_soc < 10:
         raise HTTPException(status_code=400, detail="Critical battery level: Only essential loads allowed.")
     # Correct pin mapping: light V31, fan V32, pump V30
     pin_map = {"light": "V31", "fan": "V32", "pump": "V30"}
@@ -360,6 +428,10 @@ async def control_load(control: LoadControl, payload: dict = Depends(verify_toke
     if not pin:
         raise HTTPException(status_code=400, detail="Invalid device")
     success = await blynk.set_value(pin, "1" if control.state else "0")
+    if success:
+        # Invalidate rather than wait out the TTL so the next dashboard
+        # read reflects the new load state
+        cache.invalidate_prefix("dashboard_data")
     return {
         "success": success,
         "device": control.device,
@@ -371,8 +443,8 @@ async def control_load(control: LoadControl, payload: dict = Depends(verify_toke
 
 @api_router.get("/grid")
 async def get_grid_data(payload: dict = Depends(verify_token)):
-    data = await build_dashboard_data()
-    return {"current": data.grid.model_dump(), "device_online": data.device_online}
+    data = await build_dashboard_dict()
+    return {"current": data['grid'], "device_online": data['device_online']}
 
 @api_router.post("/grid/mode")
 async def set_grid_mode(mode: str, payload: dict = Depends(verify_token)):
@@ -380,6 +452,7 @@ async def set_grid_mode(mode: str, payload: dict = Depends(verify_token)):
     if mode not in valid_modes:
         raise HTTPException(status_code=400, detail="Invalid mode")
     cache.set("grid_mode", mode, ttl=3600)
+    cache.invalidate_prefix("dashboard_data")
     return {"success": True, "mode": mode}
 
 # ==================== PREDICTIONS ROUTES ====================
@@ -393,29 +466,32 @@ async def get_ai_predictions(payload: dict = Depends(verify_token)):
 @api_router.get("/history")
 async def get_historical_data(results: int = 100, payload: dict = Depends(verify_token)):
     try:
-        feeds = await thingspeak.fetch_feeds(results=results)
+        cols = await thingspeak.fetch_feeds_columnar(results=results)
     except Exception as e:
         logger.error(f"Failed to fetch history: {e}")
         raise HTTPException(status_code=503, detail="Historical data temporarily unavailable")
 
-    if not feeds:
+    if not cols:
         return {"data": [], "device_online": False}
 
-    processed = []
-    for feed in feeds:
-        solar_v = parse_float(feed.get('field5'))
-        solar_i = parse_float(feed.get('field6'))
-        processed.append({
-            "timestamp": feed.get('created_at'),
-            "solar_voltage": solar_v,
-            "solar_current": solar_i,
-            "solar_power": solar_v * solar_i,
-            "battery_soc": parse_float(feed.get('field3')),
-            "battery_voltage": parse_float(feed.get('field1')),
-            "battery_current": parse_float(feed.get('field2')),
-            "load_power": parse_float(feed.get('field7')),
-            "load_current": parse_float(feed.get('field8'))
-        })
+    solar_power = (cols['field5'] * cols['field6']).tolist()
+    processed = [
+        {
+            "timestamp": t,
+            "solar_voltage": sv,
+            "solar_current": si,
+            "solar_power": sp,
+            "battery_soc": soc,
+            "battery_voltage": bv,
+            "battery_current": bc,
+            "load_power": lp,
+            "load_current": lc
+        }
+        for t, sv, si, sp, soc, bv, bc, lp, lc in zip(
+            cols['timestamp'], cols['field5'].tolist(), cols['field6'].tolist(),
+            solar_power, cols['field3'].tolist(), cols['field1'].tolist(),
+            cols['field2'].tolist(), cols['field7'].tolist(), cols['field8'].tolist())
+    ]
     return {"data": processed, "device_online": True}
 
 # ==================== CSV EXPORT ====================
@@ -423,39 +499,62 @@ async def get_historical_data(results: int = 100, payload: dict = Depends(verify
 @api_router.get("/export/csv")
 async def export_csv(payload: dict = Depends(verify_token)):
     try:
-        feeds = await thingspeak.fetch_feeds(results=500)
+        cols = await thingspeak.fetch_feeds_columnar(results=500)
     except Exception as e:
         logger.error(f"Failed to fetch data for CSV export: {e}")
         raise HTTPException(status_code=503, detail="Data source unavailable")
 
-    if not feeds:
+    if not cols:
         raise HTTPException(status_code=404, detail="No data available for export")
 
-    csv_data = "timestamp,solar_voltage,solar_current,solar_power,battery_soc,battery_voltage,battery_current,load_power,load_current\n"
-    for feed in feeds:
-        solar_v = parse_float(feed.get('field5', '0'))
-        solar_i = parse_float(feed.get('field6', '0'))
-        solar_p = solar_v * solar_i
-        row = f"{feed.get('created_at','')},{solar_v},{solar_i},{solar_p},{feed.get('field3','')},{feed.get('field1','')},{feed.get('field2','')},{feed.get('field7','')},{feed.get('field8','')}\n"
-        csv_data += row
+    # Columnar source: fields are parsed once (shared with the history
+    # endpoints) and solar power is one vectorized multiply. Rows are
+    # streamed in chunks so peak memory stays O(chunk) rather than holding
+    # the full export in one buffer.
+    solar_power = (cols['field5'] * cols['field6']).tolist()
+    rows = list(zip(cols['timestamp'], cols['field5'].tolist(), cols['field6'].tolist(),
+                    solar_power, cols['field3'].tolist(), cols['field1'].tolist(),
+                    cols['field2'].tolist(), cols['field7'].tolist(), cols['field8'].tolist()))
+
+    def iter_csv(chunk_size: int = 100):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(["timestamp", "solar_voltage", "solar_current", "solar_power",
+                         "battery_soc", "battery_voltage", "battery_current",
+                         "load_power", "load_current"])
+        for start in range(0, len(rows), chunk_size):
+            writer.writerows(rows[start:start + chunk_size])
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate(0)
 
     filename = f"isems_export_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv"
-    return Response(
-        content=csv_data,
+    return StreamingResponse(
+        iter_csv(),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
 
 # ==================== HEALTH CHECK ====================
 
+async def _probe_thingspeak() -> str:
+    # Bounded so health never blocks behind a slow upstream. The typed except
+    # keeps CancelledError flowing for clean shutdown instead of being
+    # swallowed by a bare except.
+    try:
+        await asyncio.wait_for(thingspeak.check_online(), timeout=1.0)
+        return "ok"
+    except (asyncio.TimeoutError, httpx.HTTPError):
+        return "unreachable"
+
 @api_router.get("/health")
 async def health_check():
-    # Optionally check ThingSpeak connectivity
-    try:
-        await thingspeak.check_online()
-        ts_status = "ok"
-    except:
-        ts_status = "unreachable"
+    # Cached probe: load balancers polling /health at 1Hz shouldn't generate
+    # constant upstream traffic
+    ts_status = await cache.get_or_set_swr(
+        "thingspeak_health", _probe_thingspeak,
+        ttl=CACHE_TTL_SECONDS, stale_ttl=120
+    )
     return {
         "status": "healthy",
         "thingspeak": ts_status,
@@ -478,17 +577,30 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
             await websocket.close(code=4001)
             return
     await manager.connect(websocket)
+    # Send the current snapshot right away; the shared producer task takes
+    # over from there, so this connection costs no per-client timer loop.
     try:
+        await websocket.send_text(orjson.dumps(await build_dashboard_dict()).decode())
         while True:
-            data = await build_dashboard_data()
-            await websocket.send_json(data.model_dump())
-            await asyncio.sleep(2)
+            await websocket.receive_text()  # only to observe disconnects
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
         manager.disconnect(websocket)
 
+async def _dashboard_producer():
+    """Single producer for all WebSocket clients: one dashboard rebuild and
+    one broadcast per 2s tick, regardless of how many clients are connected."""
+    while True:
+        try:
+            if manager.active_connections:
+                data = await build_dashboard_dict()
+                await manager.broadcast(data)
+        except Exception as e:
+            logger.error(f"Dashboard producer error: {e}")
+        await asyncio.sleep(2)
+
 # Include router and add middleware
 app.include_router(api_router)
 app.add_middleware(
@@ -499,10 +611,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+_producer_task = None
+
+@app.on_event("startup")
+async def start_background_tasks():
+    global _producer_task
+    _producer_task = asyncio.create_task(_dashboard_producer())
+    try:
+        await db.users.create_index("email", unique=True)
+    except Exception as e:
+        logger.warning(f"Could not ensure users.email index: {e}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    if _producer_task:
+        _producer_task.cancel()
+    await thingspeak.aclose()
+    await blynk.aclose()
     client.close()
+    shutdown_crypto_pool()
+    _log_listener.stop()
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("main:app", host="0.0.0.0", port=PORT, reload=False)
+    # uvloop/httptools ship with uvicorn[standard]; "auto" falls back to
+    # asyncio/h11 where they aren't available. Keep workers=1: the in-process
+    # caches and the shared WebSocket producer assume a single process.
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=PORT,
+        reload=False,
+        loop="auto",
+        http="auto",
+        backlog=4096,
+        timeout_keep_alive=30,
+        ws_ping_interval=20,
+        ws_ping_timeout=20
+    )
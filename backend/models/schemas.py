@@ -31,7 +31,13 @@ class TokenResponse(BaseModel):
 
 # ==================== DATA MODELS ====================
 
+# Dashboard structs are built once per snapshot and then served as cached
+# dicts; frozen keeps them immutable so a cached snapshot can't be mutated
+# by a handler, and lets pydantic-core skip assignment machinery entirely.
+_FROZEN = ConfigDict(frozen=True)
+
 class SolarData(BaseModel):
+    model_config = _FROZEN
     voltage: float = 0.0
     current: float = 0.0
     power: float = 0.0
@@ -40,6 +46,7 @@ class SolarData(BaseModel):
     timestamp: str = ""
 
 class BatteryData(BaseModel):
+    model_config = _FROZEN
     voltage: float = 0.0
     current: float = 0.0
     soc: float = 0.0
@@ -49,6 +56,7 @@ class BatteryData(BaseModel):
     timestamp: str = ""
 
 class LoadData(BaseModel):
+    model_config = _FROZEN
     power: float = 0.0
     current: float = 0.0
     light_on: bool = False
@@ -57,12 +65,14 @@ class LoadData(BaseModel):
     timestamp: str = ""
 
 class GridData(BaseModel):
+    model_config = _FROZEN
     online: bool = True
     mode: str = "hybrid"
     power: float = 0.0
     timestamp: str = ""
 
 class DashboardData(BaseModel):
+    model_config = _FROZEN
     solar: SolarData
     battery: BatteryData
     load: LoadData
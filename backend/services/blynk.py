@@ -1,6 +1,8 @@
 # services/blynk.py
-import aiohttp
+import asyncio
+import httpx
 import logging
+from typing import Optional
 from core.config import BLYNK_AUTH_TOKEN, BLYNK_BASE_URL
 
 logger = logging.getLogger(__name__)
@@ -9,19 +11,34 @@ class BlynkService:
     def __init__(self):
         self.token = BLYNK_AUTH_TOKEN
         self.base_url = BLYNK_BASE_URL
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Lazily created persistent client: keep-alive connections avoid a
+        fresh TCP+TLS handshake per pin read/write."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=5.0,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled client (called from app shutdown)."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
 
     async def set_value(self, pin: str, value: str) -> bool:
         """Set a virtual pin value via Blynk HTTP API."""
         url = f"{self.base_url}/update?token={self.token}&pin={pin}&value={value}"
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as resp:
-                    if resp.status == 200:
-                        logger.info(f"Blynk set {pin} to {value}")
-                        return True
-                    else:
-                        logger.error(f"Blynk set failed for {pin}: {resp.status}")
-                        return False
+            resp = await self._get_client().get(url)
+            if resp.status_code == 200:
+                logger.info(f"Blynk set {pin} to {value}")
+                return True
+            else:
+                logger.error(f"Blynk set failed for {pin}: {resp.status_code}")
+                return False
         except Exception as e:
             logger.error(f"Blynk set error: {e}")
             return False
@@ -34,39 +51,41 @@ class BlynkService:
         """
         url = f"{self.base_url}/get?token={self.token}&pin={pin}"
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url) as resp:
-                    if resp.status == 200:
-                        try:
-                            data = await resp.json()
-                            # Expected: [value] (array with one element)
-                            if isinstance(data, list) and len(data) > 0:
-                                # Convert to string; if it's a number, str() works fine
-                                return str(data[0])
-                            elif isinstance(data, (int, float)):
-                                # Sometimes Blynk returns a single number directly
-                                return str(data)
-                            elif isinstance(data, dict) and "error" in data:
-                                logger.error(f"Blynk error for {pin}: {data['error']}")
-                                return "0"
-                            else:
-                                logger.warning(f"Unexpected Blynk response for {pin}: {data}")
-                                return "0"
-                        except Exception as e:
-                            logger.error(f"Blynk JSON parse error for {pin}: {e}")
-                            return "0"
+            resp = await self._get_client().get(url)
+            if resp.status_code == 200:
+                try:
+                    data = resp.json()
+                    # Expected: [value] (array with one element)
+                    if isinstance(data, list) and len(data) > 0:
+                        # Convert to string; if it's a number, str() works fine
+                        return str(data[0])
+                    elif isinstance(data, (int, float)):
+                        # Sometimes Blynk returns a single number directly
+                        return str(data)
+                    elif isinstance(data, dict) and "error" in data:
+                        logger.error(f"Blynk error for {pin}: {data['error']}")
+                        return "0"
                     else:
-                        logger.error(f"Blynk get failed for {pin}: {resp.status}")
+                        logger.warning(f"Unexpected Blynk response for {pin}: {data}")
                         return "0"
+                except Exception as e:
+                    logger.error(f"Blynk JSON parse error for {pin}: {e}")
+                    return "0"
+            else:
+                logger.error(f"Blynk get failed for {pin}: {resp.status_code}")
+                return "0"
         except Exception as e:
             logger.error(f"Blynk get error: {e}")
             return "0"
 
     async def get_load_states(self) -> dict:
-        """Retrieve current on/off states of all loads from Blynk."""
-        light = await self.get_pin_value("V31")
-        fan = await self.get_pin_value("V32")
-        pump = await self.get_pin_value("V30")
+        """Retrieve current on/off states of all loads from Blynk.
+        The three pin reads are independent, so they run concurrently."""
+        light, fan, pump = await asyncio.gather(
+            self.get_pin_value("V31"),
+            self.get_pin_value("V32"),
+            self.get_pin_value("V30")
+        )
         return {
             "light_on": light == "1",
             "fan_on": fan == "1",
@@ -74,25 +93,24 @@ class BlynkService:
         }
 
     async def get_load_metrics(self) -> dict:
-        """Retrieve per‑load voltage, current, and power from Blynk."""
+        """Retrieve per‑load voltage, current, and power from Blynk.
+        All nine pin reads are issued concurrently — one round-trip of wall
+        time instead of nine sequential ones."""
         def safe_float(val):
             try:
                 return float(val) if val else 0.0
             except (ValueError, TypeError):
                 return 0.0
 
-        # Pump: V10 = voltage, V11 = current, V12 = power
-        pump_v = safe_float(await self.get_pin_value("V10"))
-        pump_i = safe_float(await self.get_pin_value("V11"))
-        pump_p = safe_float(await self.get_pin_value("V12"))
-        # Light: V14 = voltage, V15 = current, V16 = power
-        light_v = safe_float(await self.get_pin_value("V14"))
-        light_i = safe_float(await self.get_pin_value("V15"))
-        light_p = safe_float(await self.get_pin_value("V16"))
-        # Fan: V18 = voltage, V19 = current, V20 = power
-        fan_v = safe_float(await self.get_pin_value("V18"))
-        fan_i = safe_float(await self.get_pin_value("V19"))
-        fan_p = safe_float(await self.get_pin_value("V20"))
+        # Pump: V10-V12, Light: V14-V16, Fan: V18-V20 (voltage, current, power)
+        values = await asyncio.gather(
+            self.get_pin_value("V10"), self.get_pin_value("V11"), self.get_pin_value("V12"),
+            self.get_pin_value("V14"), self.get_pin_value("V15"), self.get_pin_value("V16"),
+            self.get_pin_value("V18"), self.get_pin_value("V19"), self.get_pin_value("V20")
+        )
+        (pump_v, pump_i, pump_p,
+         light_v, light_i, light_p,
+         fan_v, fan_i, fan_p) = (safe_float(v) for v in values)
 
         return {
             "light": {"voltage": light_v, "current": light_i, "power": light_p},
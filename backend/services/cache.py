@@ -1,36 +1,136 @@
+import asyncio
+import heapq
+import logging
 from datetime import datetime, timezone, timedelta
-from typing import Any, Optional, Dict
+from typing import Any, Awaitable, Callable, List, Optional, Dict, Tuple
+
+logger = logging.getLogger(__name__)
 
 class CacheService:
-    def __init__(self, default_ttl: int = 10):
+    def __init__(self, default_ttl: int = 10, maxsize: int = 256):
         self._store: Dict[str, Any] = {}
         self._expiry: Dict[str, datetime] = {}
+        # Retention deadline per entry: freshness expiry plus any stale grace.
+        # Eviction honors this, not _expiry, so a stale-while-revalidate entry
+        # survives the sweep for as long as it may still be served stale.
+        self._retention: Dict[str, datetime] = {}
         self._default_ttl = default_ttl
+        self._maxsize = maxsize
+        # Min-heap of (retention, key) for active eviction; entries go stale
+        # when a key is re-set, so each is checked against _retention on pop
+        self._heap: List[Tuple[datetime, str]] = []
+        self._refresh_locks: Dict[str, asyncio.Lock] = {}
 
     def get(self, key: str) -> Optional[Any]:
         if key in self._store and key in self._expiry:
             if datetime.now(timezone.utc) < self._expiry[key]:
                 return self._store[key]
-            else:
-                del self._store[key]
-                del self._expiry[key]
+            # Expired for plain readers, but left in place until its retention
+            # deadline so get_or_set_swr can still serve it stale
         return None
 
-    def set(self, key: str, value: Any, ttl: int = None) -> None:
+    def set(self, key: str, value: Any, ttl: int = None, stale_ttl: int = 0) -> None:
+        """Store a value fresh for `ttl` seconds; `stale_ttl` extends how long
+        the expired value is retained for stale-while-revalidate reads."""
         ttl = ttl or self._default_ttl
+        now = datetime.now(timezone.utc)
+        expiry = now + timedelta(seconds=ttl)
+        retention = expiry + timedelta(seconds=stale_ttl)
         self._store[key] = value
-        self._expiry[key] = datetime.now(timezone.utc) + timedelta(seconds=ttl)
+        self._expiry[key] = expiry
+        self._retention[key] = retention
+        heapq.heappush(self._heap, (retention, key))
+        self._evict_expired()
+
+    def _evict_expired(self) -> None:
+        """Pop entries past their retention deadline off the heap so a
+        long-running process doesn't accumulate dead keys; heap entries
+        superseded by a later set() are skipped. Also enforces maxsize by
+        dropping the soonest-to-lapse live entries."""
+        now = datetime.now(timezone.utc)
+        while self._heap and (self._heap[0][0] <= now
+                              or len(self._store) > self._maxsize):
+            retention, key = heapq.heappop(self._heap)
+            if self._retention.get(key) == retention:
+                del self._store[key]
+                del self._expiry[key]
+                del self._retention[key]
 
     def delete(self, key: str) -> bool:
         if key in self._store:
             del self._store[key]
-            if key in self._expiry:
-                del self._expiry[key]
+            self._expiry.pop(key, None)
+            self._retention.pop(key, None)
             return True
         return False
 
     def clear(self) -> None:
         self._store.clear()
         self._expiry.clear()
+        self._retention.clear()
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Drop every entry whose key starts with `prefix`.
+
+        Used by write paths (load control, grid mode) so the next dashboard
+        read reflects the change immediately instead of waiting out the TTL.
+        Returns the number of entries removed."""
+        stale_keys = [k for k in self._store if k.startswith(prefix)]
+        for key in stale_keys:
+            self.delete(key)
+        return len(stale_keys)
+
+    async def get_or_set_swr(self, key: str, factory: Callable[[], Awaitable[Any]],
+                             ttl: int = None, stale_ttl: int = None) -> Any:
+        """Stale-while-revalidate read-through.
+
+        Fresh entries are returned directly. Entries past their TTL but within
+        `stale_ttl` of it are returned immediately while one background task
+        refreshes them, so callers never wait on the upstream at a TTL
+        boundary. Only a cold miss (no value, or value beyond the stale
+        window) computes inline — and a per-key lock makes concurrent cold
+        misses share that one computation."""
+        ttl = ttl or self._default_ttl
+        stale_ttl = stale_ttl if stale_ttl is not None else ttl * 4
+        now = datetime.now(timezone.utc)
+
+        fresh_until = self._expiry.get(key)
+        if key in self._store and fresh_until is not None:
+            if now < fresh_until:
+                return self._store[key]
+            if now < fresh_until + timedelta(seconds=stale_ttl):
+                self._spawn_refresh(key, factory, ttl, stale_ttl)
+                return self._store[key]
+
+        lock = self._refresh_locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Another waiter may have filled the entry while we queued
+            fresh_until = self._expiry.get(key)
+            if key in self._store and fresh_until is not None \
+                    and datetime.now(timezone.utc) < fresh_until:
+                return self._store[key]
+            value = await factory()
+            self.set(key, value, ttl=ttl, stale_ttl=stale_ttl)
+            return value
+
+    def _spawn_refresh(self, key: str, factory: Callable[[], Awaitable[Any]],
+                       ttl: int, stale_ttl: int = 0) -> None:
+        lock = self._refresh_locks.setdefault(key, asyncio.Lock())
+        if lock.locked():
+            return  # a refresh is already in flight
+
+        async def _refresh():
+            async with lock:
+                fresh_until = self._expiry.get(key)
+                if fresh_until is not None and datetime.now(timezone.utc) < fresh_until:
+                    return
+                try:
+                    value = await factory()
+                except Exception as e:
+                    logger.warning(f"Background refresh for '{key}' failed, serving stale: {e}")
+                    return
+                self.set(key, value, ttl=ttl, stale_ttl=stale_ttl)
+
+        asyncio.get_running_loop().create_task(_refresh())
 
 cache = CacheService(default_ttl=10)
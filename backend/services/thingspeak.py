@@ -1,50 +1,211 @@
 """
 ThingSpeak Integration Service
 """
+import asyncio
 import httpx
 import logging
+import time
+import orjson
 from typing import Optional, List, Dict
 from datetime import datetime, timezone
 from services.cache import cache
 from core.config import THINGSPEAK_BASE_URL, THINGSPEAK_CHANNEL_ID, THINGSPEAK_READ_KEY
+from utils.helpers import parse_float_array
 
 logger = logging.getLogger(__name__)
 
+# Numeric channel fields exposed by the columnar view (field4 is unused)
+_FIELD_KEYS = ('field1', 'field2', 'field3', 'field5', 'field6', 'field7', 'field8')
+
+# One canonical upstream window shared by every caller: /solar, /battery,
+# /load, /history, export and the predictor all slice this instead of each
+# fetching (and caching) their own results=N variant
+_CANONICAL_RESULTS = 500
+_CANONICAL_KEY = "thingspeak_feeds"
+
+# How long past its TTL an expired snapshot may still be served while a
+# background refresh runs (stale-while-revalidate)
+_STALE_TTL = 40
+
 class ThingSpeakService:
     def __init__(self):
         self.base_url = THINGSPEAK_BASE_URL
         self.channel_id = THINGSPEAK_CHANNEL_ID
         self.api_key = THINGSPEAK_READ_KEY
+        # Hot-path constants: URL and auth params never change per call
+        self._feeds_url = f"{self.base_url}/channels/{self.channel_id}/feeds.json"
+        self._base_params = {"api_key": self.api_key}
+        self._inflight: Dict[int, asyncio.Future] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        # (raw created_at, parsed datetime) memo for check_online: within a
+        # cache window the latest feed doesn't change, so parse it once
+        self._parsed_created: Optional[tuple] = None
+        # Last good snapshot kept past TTL expiry: (window, feeds, deadline)
+        self._stale: Optional[tuple] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Lazily created persistent client: keep-alive connections avoid a
+        fresh TCP+TLS handshake per fetch."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=10.0,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50)
+            )
+        return self._client
+
+    async def aclose(self):
+        """Close the pooled client (called from app shutdown)."""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
 
     async def fetch_feeds(self, results: int = 10) -> Optional[List[Dict]]:
-        """Fetch feeds from ThingSpeak with caching.
-        Returns feeds in reverse chronological order (most recent first)."""
-        cache_key = f"thingspeak_{results}"
-        cached = cache.get(cache_key)
-        if cached:
-            logger.debug(f"Returning cached ThingSpeak feeds (key={cache_key})")
-            return cached
+        """Fetch feeds from ThingSpeak with caching and request coalescing.
+
+        All window sizes are served from one canonical upstream fetch of
+        max(results, 500) entries; smaller callers get the most recent
+        `results` sliced from it. This keeps every route on a consistent
+        snapshot within the cache window and collapses what used to be one
+        upstream request per distinct results value into one total."""
+        window = max(results, _CANONICAL_RESULTS)
+        cached = cache.get(_CANONICAL_KEY)
+        if cached is not None:
+            cached_window, feeds = cached
+            # A shorter cached window still covers us if the channel simply
+            # has fewer entries than was asked for
+            if cached_window >= window or len(feeds) < cached_window:
+                logger.debug(f"Returning cached ThingSpeak feeds (results={results})")
+                return self._slice_recent(feeds, results)
+
+        # Stale-while-revalidate: an expired snapshot within the stale window
+        # is served immediately while one background task refreshes, so reads
+        # never block on ThingSpeak RTT at a TTL boundary
+        stale = self._stale
+        if stale is not None:
+            s_window, s_feeds, s_deadline = stale
+            if ((s_window >= window or len(s_feeds) < s_window)
+                    and time.monotonic() < s_deadline):
+                if window not in self._inflight:
+                    asyncio.get_running_loop().create_task(self._refresh(window))
+                return self._slice_recent(s_feeds, results)
+
+        inflight = self._inflight.get(window)
+        if inflight is not None:
+            logger.debug(f"Awaiting in-flight ThingSpeak fetch (window={window})")
+            feeds = await inflight
+            return self._slice_recent(feeds, results) if feeds is not None else None
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[window] = fut
+        try:
+            feeds = await self._fetch_remote(window)
+        except BaseException:
+            # Waiters get the service's usual error signal (None); the
+            # producer's own exception (e.g. cancellation) still propagates.
+            fut.set_result(None)
+            raise
+        finally:
+            self._inflight.pop(window, None)
+
+        if feeds is not None:
+            self._store_snapshot(window, feeds)
+        fut.set_result(feeds)
+        return self._slice_recent(feeds, results) if feeds is not None else None
 
+    def _store_snapshot(self, window: int, feeds: List[Dict]) -> None:
+        cache.set(_CANONICAL_KEY, (window, feeds), ttl=10)
+        self._stale = (window, feeds, time.monotonic() + _STALE_TTL)
+
+    async def _refresh(self, window: int) -> None:
+        """Background revalidation for a stale snapshot; coalesced through
+        the same in-flight map as foreground fetches."""
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[window] = fut
+        feeds = None
+        try:
+            feeds = await self._fetch_remote(window)
+        except Exception as e:
+            logger.warning(f"Background feed refresh failed, serving stale: {e}")
+        finally:
+            self._inflight.pop(window, None)
+            if feeds is not None:
+                self._store_snapshot(window, feeds)
+            fut.set_result(feeds)
+
+    @staticmethod
+    def _slice_recent(feeds: List[Dict], results: int) -> List[Dict]:
+        """Most recent `results` entries, preserving the feed's own ordering.
+        Orientation is detected from created_at (ISO strings compare
+        lexicographically), so either chronological direction works."""
+        if results <= 0:
+            # feeds[-0:] would be the whole window, not an empty slice
+            return []
+        if results >= len(feeds):
+            return feeds
+        first = feeds[0].get('created_at') or ''
+        last = feeds[-1].get('created_at') or ''
+        return feeds[-results:] if first <= last else feeds[:results]
+
+    async def _fetch_remote(self, results: int) -> Optional[List[Dict]]:
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                url = f"{self.base_url}/channels/{self.channel_id}/feeds.json"
-                params = {"api_key": self.api_key, "results": results}
-                response = await client.get(url, params=params)
-                if response.status_code == 200:
-                    data = response.json()
-                    feeds = data.get("feeds", [])
-                    cache.set(cache_key, feeds, ttl=10)
-                    logger.info(f"Fetched {len(feeds)} feeds from ThingSpeak")
-                    return feeds
-                else:
-                    logger.error(f"ThingSpeak fetch_feeds failed: {response.status_code}")
-                    return None
+            params = {**self._base_params, "results": results}
+            response = await self._get_client().get(self._feeds_url, params=params)
+            if response.status_code == 200:
+                data = orjson.loads(response.content)
+                feeds = data.get("feeds", [])
+                logger.debug(f"Fetched {len(feeds)} feeds from ThingSpeak")
+                return feeds
+            else:
+                logger.error(f"ThingSpeak fetch_feeds failed: {response.status_code}")
+                return None
         except Exception as e:
             logger.error(f"ThingSpeak fetch_feeds error: {e}")
             return None
 
+    async def fetch_many(self, sizes: List[int]) -> List[Optional[List[Dict]]]:
+        """Fetch several window sizes concurrently, in input order.
+        With the canonical shared window these normally coalesce into a
+        single upstream request via the in-flight map; anything that does
+        go out rides the pooled keep-alive connection."""
+        return list(await asyncio.gather(*(self.fetch_feeds(n) for n in sizes)))
+
+    async def fetch_feeds_columnar(self, results: int = 100) -> Optional[Dict]:
+        """Feeds as structure-of-arrays: a 'timestamp' list plus one float64
+        array per numeric field. Parsed once and cached, so the history
+        endpoints share a single parse_float pass over each field instead of
+        re-parsing the same feeds per endpoint."""
+        cache_key = f"thingspeak_cols_{results}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        feeds = await self.fetch_feeds(results=results)
+        if not feeds:
+            return None
+
+        cols = {'timestamp': [f.get('created_at') for f in feeds]}
+        for key in _FIELD_KEYS:
+            cols[key] = parse_float_array([f.get(key) for f in feeds])
+        cache.set(cache_key, cols, ttl=10)
+        return cols
+
     async def fetch_latest(self) -> Optional[Dict]:
-        """Fetch the single most recent feed entry."""
+        """Fetch the single most recent feed entry.
+        Reuses any feed window already cached by the other endpoints before
+        issuing its own request, so a dashboard rebuild that just pulled 288
+        feeds doesn't trigger a second upstream round-trip. The newest entry
+        is picked by created_at (ISO strings sort lexicographically), which is
+        robust to either feed ordering."""
+        cached = cache.get(_CANONICAL_KEY)
+        if cached is not None and cached[1]:
+            feeds = cached[1]
+            return max((feeds[0], feeds[-1]),
+                       key=lambda f: f.get('created_at') or '')
         feeds = await self.fetch_feeds(results=1)
         if feeds and len(feeds) > 0:
             return feeds[0]  # newest first
@@ -59,15 +220,25 @@ class ThingSpeakService:
         created = latest.get("created_at")
         if not created:
             return False
-        try:
-            last_time = datetime.fromisoformat(created.replace("Z", "+00:00"))
-            now = datetime.now(timezone.utc)
-            delta = (now - last_time).total_seconds()
-            logger.debug(f"Latest feed timestamp: {created}, delta: {delta}s")
-            return delta <= max_age_seconds
-        except Exception as e:
-            logger.error(f"Error parsing timestamp: {e}")
-            return False
+        memo = self._parsed_created
+        if memo is not None and memo[0] == created:
+            last_time = memo[1]
+        else:
+            try:
+                # fromisoformat accepts a trailing 'Z' on Python 3.11+; keep
+                # the replace() fallback for older runtimes
+                try:
+                    last_time = datetime.fromisoformat(created)
+                except ValueError:
+                    last_time = datetime.fromisoformat(created.replace("Z", "+00:00"))
+            except Exception as e:
+                logger.error(f"Error parsing timestamp: {e}")
+                return False
+            self._parsed_created = (created, last_time)
+        now = datetime.now(timezone.utc)
+        delta = (now - last_time).total_seconds()
+        logger.debug(f"Latest feed timestamp: {created}, delta: {delta}s")
+        return delta <= max_age_seconds
 
 # Global instance
 thingspeak = ThingSpeakService()
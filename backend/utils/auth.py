@@ -1,37 +1,103 @@
 """
 Authentication Utilities
 """
+import asyncio
+import hmac
+import time
 import jwt
 import bcrypt
-from datetime import datetime, timezone, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from core.config import JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRATION_HOURS
+from core.config import JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRATION_HOURS, BCRYPT_COST
 
 security = HTTPBearer()
 
+# Short-TTL cache for bcrypt verification: repeated logins with the same
+# credentials (browser retries, polling dashboards) skip the intentionally
+# slow checkpw. Keys are HMAC digests over (password, hash) with the server
+# secret, so neither raw passwords nor reversible material is stored.
+_VERIFY_CACHE = {}
+_VERIFY_TTL = 30
+_VERIFY_MAX = 1024
+
 def hash_password(password: str) -> str:
-    """Hash password using bcrypt"""
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    """Hash password using bcrypt (work factor from BCRYPT_COST)"""
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(BCRYPT_COST)).decode()
 
 def verify_password(password: str, hashed: str) -> bool:
-    """Verify password against hash"""
-    return bcrypt.checkpw(password.encode(), hashed.encode())
+    """Verify password against hash (result cached briefly, keyed by HMAC)"""
+    key = hmac.new(JWT_SECRET.encode(),
+                   password.encode() + b"\x00" + hashed.encode(),
+                   'sha256').digest()
+    now = time.monotonic()
+    hit = _VERIFY_CACHE.get(key)
+    if hit is not None and now - hit[1] < _VERIFY_TTL:
+        return hit[0]
+    # Re-derive with the stored salt and compare via hmac.compare_digest:
+    # XOR-accumulating, so timing is independent of matching prefix length
+    hashed_bytes = hashed.encode()
+    result = hmac.compare_digest(
+        bcrypt.hashpw(password.encode(), hashed_bytes), hashed_bytes
+    )
+    if len(_VERIFY_CACHE) >= _VERIFY_MAX:
+        _VERIFY_CACHE.clear()
+    _VERIFY_CACHE[key] = (result, now)
+    return result
+
+# Bounded pool for bcrypt key derivation: at the default cost it blocks for
+# hundreds of ms, and bcrypt releases the GIL, so running it here keeps the
+# event loop serving other requests during logins/registrations.
+_CRYPTO_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="crypto")
+
+async def hash_password_async(password: str) -> str:
+    """hash_password off the event loop (dedicated crypto pool)"""
+    return await asyncio.get_running_loop().run_in_executor(
+        _CRYPTO_POOL, hash_password, password)
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    """verify_password off the event loop (dedicated crypto pool)"""
+    return await asyncio.get_running_loop().run_in_executor(
+        _CRYPTO_POOL, verify_password, password, hashed)
+
+def shutdown_crypto_pool() -> None:
+    """Shut down the bcrypt pool (called from app shutdown)."""
+    _CRYPTO_POOL.shutdown(wait=False)
+
+_EXP_SECONDS = JWT_EXPIRATION_HOURS * 3600
 
 def create_token(user_id: str, email: str) -> str:
     """Create JWT token"""
     payload = {
         "sub": user_id,
         "email": email,
-        "exp": datetime.now(timezone.utc) + timedelta(hours=JWT_EXPIRATION_HOURS)
+        # Integer POSIX seconds — what PyJWT would convert a datetime to anyway
+        "exp": int(time.time()) + _EXP_SECONDS
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+# Decoded-payload cache: a client reusing the same Bearer token shouldn't pay
+# HMAC verification + base64 parsing on every request. Entries self-invalidate
+# against their own exp claim, so nothing outlives its token.
+_TOKEN_CACHE = {}
+_TOKEN_CACHE_MAX = 10_000
+
+def _decode_token(token: str) -> dict:
+    payload = _TOKEN_CACHE.get(token)
+    if payload is not None:
+        if payload.get('exp', 0) > time.time():
+            return payload
+        del _TOKEN_CACHE[token]
+    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    if len(_TOKEN_CACHE) >= _TOKEN_CACHE_MAX:
+        _TOKEN_CACHE.clear()
+    _TOKEN_CACHE[token] = payload
+    return payload
+
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
-    """Verify JWT token and return payload"""
+    """Verify JWT token and return payload (decode cached per token)"""
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
+        return _decode_token(credentials.credentials)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
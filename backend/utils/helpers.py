@@ -1,13 +1,39 @@
 """
 Helper Utilities
 """
-from typing import Any
+import functools
+import numpy as np
+from typing import Any, Iterable
+
+@functools.lru_cache(maxsize=4096)
+def _parse_float_str(value: str, default: float) -> float:
+    try:
+        return float(value) if value != "" else default
+    except ValueError:
+        return default
 
 def parse_float(value: Any, default: float = 0.0) -> float:
-    """Safely parse float from any value"""
+    """Safely parse float from any value.
+    String inputs go through a small LRU cache: ThingSpeak field values
+    repeat heavily across feeds (e.g. a flat SOC), so most parses on the
+    bulk paths are dict hits instead of float() calls."""
+    if isinstance(value, str):
+        return _parse_float_str(value, default)
     try:
-        if value is None or value == "":
+        if value is None:
             return default
         return float(value)
     except (ValueError, TypeError):
         return default
+
+def parse_float_array(values: Iterable[Any], default: float = 0.0) -> np.ndarray:
+    """Parse a whole column of feed values into a float64 array.
+    The common case — every value a well-formed number string — converts in
+    one C-level NumPy call; any malformed value drops the column to an
+    element-wise parse_float fallback."""
+    cleaned = [default if v is None or v == "" else v for v in values]
+    try:
+        return np.asarray(cleaned, dtype=np.float64)
+    except (ValueError, TypeError):
+        return np.fromiter((parse_float(v, default) for v in cleaned),
+                           dtype=np.float64, count=len(cleaned))
@@ -4,9 +4,11 @@ ISEMS Backend API Testing Suite
 Tests all backend endpoints for the Intelligent Solar Energy Management System
 """
 
+import concurrent.futures
+import orjson
 import requests
 import sys
-import json
+import threading
 from datetime import datetime
 from typing import Dict, Any, Optional
 
@@ -21,29 +23,53 @@ class ISEMSAPITester:
         self.failed_tests = []
         self.session = requests.Session()
         self.session.timeout = 10
+        # Sized keep-alive pool: every test reuses the same TCP(+TLS)
+        # connection instead of paying a handshake per request
+        adapter = requests.adapters.HTTPAdapter(pool_connections=32, pool_maxsize=32)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({'Content-Type': 'application/json'})
+        self._lock = threading.Lock()
+
+    @property
+    def token(self) -> Optional[str]:
+        return self._token
+
+    @token.setter
+    def token(self, value: Optional[str]):
+        # Rebuild the Authorization header only when the token changes, not
+        # per request
+        self._token = value
+        self._auth_header = {'Authorization': f'Bearer {value}'} if value else {}
 
     def log_result(self, test_name: str, success: bool, details: str = ""):
-        """Log test result"""
-        self.tests_run += 1
+        """Log test result (thread-safe: independent tests run in parallel)"""
         status = "✅ PASS" if success else "❌ FAIL"
-        print(f"{status} | {test_name}")
-        if details:
-            print(f"    {details}")
-        
-        if success:
-            self.tests_passed += 1
-        else:
-            self.failed_tests.append({"test": test_name, "details": details})
+        with self._lock:
+            self.tests_run += 1
+            print(f"{status} | {test_name}")
+            if details:
+                print(f"    {details}")
+
+            if success:
+                self.tests_passed += 1
+            else:
+                self.failed_tests.append({"test": test_name, "details": details})
+
+    def _run_parallel(self, tests):
+        """Run independent read-only tests concurrently; requests overlap
+        in flight instead of serializing round-trips."""
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+            concurrent.futures.wait([pool.submit(t) for t in tests])
 
     def make_request(self, method: str, endpoint: str, data: Optional[Dict] = None, 
                     expected_status: int = 200, auth_required: bool = True) -> tuple[bool, Dict]:
         """Make HTTP request and validate response"""
         url = f"{self.base_url}/api/{endpoint}"
-        headers = {'Content-Type': 'application/json'}
-        
-        if auth_required and self.token:
-            headers['Authorization'] = f'Bearer {self.token}'
-        
+        # Content-Type rides on the session; only the prebuilt auth header
+        # varies per call
+        headers = self._auth_header if (auth_required and self.token) else None
+
         try:
             if method == 'GET':
                 response = self.session.get(url, headers=headers)
@@ -57,8 +83,9 @@ class ISEMSAPITester:
             success = response.status_code == expected_status
             
             try:
-                response_data = response.json()
-            except:
+                # orjson decodes straight from bytes — no intermediate str
+                response_data = orjson.loads(response.content)
+            except orjson.JSONDecodeError:
                 response_data = {"text": response.text, "status_code": response.status_code}
             
             return success, response_data
@@ -260,25 +287,38 @@ class ISEMSAPITester:
             self.log_result("History API", False, f"Response: {data}")
 
     def test_csv_export(self):
-        """Test CSV export API"""
-        success, data = self.make_request('GET', 'export/csv')
-        
-        if success and 'csv' in data and 'filename' in data:
-            csv_lines = len(data['csv'].split('\n'))
+        """Test CSV export API (streamed; newlines counted bytewise so the
+        full export never sits in memory)"""
+        url = f"{self.base_url}/api/export/csv"
+        headers = self._auth_header if self.token else None
+        try:
+            with self.session.get(url, headers=headers, stream=True) as response:
+                if response.status_code != 200:
+                    self.log_result("CSV Export", False, f"Status: {response.status_code}")
+                    return
+                csv_lines = sum(chunk.count(b'\n')
+                                for chunk in response.iter_content(chunk_size=65536))
             self.log_result("CSV Export", True, f"CSV lines: {csv_lines}")
-        else:
-            self.log_result("CSV Export", False, f"Response: {data}")
+        except Exception as e:
+            self.log_result("CSV Export", False, f"Error: {str(e)}")
 
     def test_websocket_endpoint(self):
         """Test WebSocket endpoint availability (basic check)"""
         try:
-            import websocket
+            import asyncio
+            import ssl
+            import websockets
             ws_url = self.base_url.replace('https://', 'wss://').replace('http://', 'ws://')
             ws_url = f"{ws_url}/ws"
-            
-            # Just test if we can connect (don't maintain connection)
-            ws = websocket.create_connection(ws_url, timeout=5)
-            ws.close()
+            ssl_ctx = ssl.create_default_context() if ws_url.startswith('wss://') else None
+
+            # Just test if we can connect (don't maintain connection); the
+            # open_timeout bounds a hung handshake instead of blocking the run
+            async def _probe():
+                async with websockets.connect(ws_url, ssl=ssl_ctx, open_timeout=5):
+                    pass
+
+            asyncio.run(_probe())
             self.log_result("WebSocket Endpoint", True, "Connection successful")
         except Exception as e:
             self.log_result("WebSocket Endpoint", False, f"Error: {str(e)}")
@@ -302,25 +342,29 @@ class ISEMSAPITester:
         self.test_user_login()  # Try admin login first
         self.test_token_validation()
 
-        # Core API tests
+        # Core API tests — independent GETs, run concurrently
         print("\n📊 CORE API TESTS")
-        self.test_dashboard_api()
-        self.test_dashboard_public()
-        self.test_solar_api()
-        self.test_battery_api()
-        self.test_load_api()
-        self.test_grid_api()
-
-        # Control API tests
+        self._run_parallel([
+            self.test_dashboard_api,
+            self.test_dashboard_public,
+            self.test_solar_api,
+            self.test_battery_api,
+            self.test_load_api,
+            self.test_grid_api,
+        ])
+
+        # Control API tests — mutate server state, keep sequential
         print("\n🎛️ CONTROL API TESTS")
         self.test_load_control()
         self.test_grid_mode_control()
 
-        # Advanced feature tests
+        # Advanced feature tests — independent GETs, run concurrently
         print("\n🧠 ADVANCED FEATURE TESTS")
-        self.test_predictions_api()
-        self.test_history_api()
-        self.test_csv_export()
+        self._run_parallel([
+            self.test_predictions_api,
+            self.test_history_api,
+            self.test_csv_export,
+        ])
 
         # Real-time tests
         print("\n⚡ REAL-TIME TESTS")